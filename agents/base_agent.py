@@ -9,29 +9,66 @@ import time
 import threading
 import random
 import json
+import functools
+import re
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from typing import Dict, List, Any, Optional, Callable, Awaitable
 from datetime import datetime
 from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from shared.state import shared_state, AgentStatus, MessageType, AgentActivityEvent, AgentMessage
 from config.config_manager import get_config
-from tools import ToolManager, ToolResult, ToolStatus
+from tools import ToolResult, ToolStatus, tool_pool
+from tools import AgentToolbox as PooledToolbox
 from utils.path_utils import safe_join, ensure_absolute_path, get_absolute_project_path
 from utils.exception_handler import with_exception_handling, log_and_suppress_exception, ensure_exception_handler_set
 import os
 from dotenv import load_dotenv
 from utils.comprehensive_logging import get_logger
 from utils.function_logger import track_function
+from utils.llm_client_pool import llm_client_pool
+from utils.metrics import file_responses_total
+from utils.span_tracer import span_tracer
 
 load_dotenv()
 
+# Label of the agent task being executed, used to key model cascade statistics
+_current_task_type: ContextVar[Optional[str]] = ContextVar("current_task_type", default=None)
+
+
+def _task_label(task_description: str) -> str:
+    """Short, stable label for a task description, e.g. "run_comprehensive_tests"."""
+    return re.sub(r"[^a-z0-9]+", "_", str(task_description).lower()).strip("_")[:48] or "task"
+
+
+def _labels_task_type(execute_task):
+    """Wrap an execute_task so think() calls made during it learn under the task's label."""
+    @functools.wraps(execute_task)
+    async def wrapper(self, task_description, *args, **kwargs):
+        token = _current_task_type.set(_task_label(task_description))
+        try:
+            return await execute_task(self, task_description, *args, **kwargs)
+        finally:
+            _current_task_type.reset(token)
+    return wrapper
+
+
 class BaseAgent(ABC):
     """
     Base class for all FlutterSwarm agents.
     Provides common functionality and enforces the agent interface.
     """
     
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Time each agent task as a span under the governance gate that runs it
+        execute_task = cls.__dict__.get("execute_task")
+        if execute_task is not None:
+            cls.execute_task = _labels_task_type(
+                span_tracer.wrap(execute_task, f"{cls.__name__}.execute_task", "agent")
+            )
+    
     def __init__(self, agent_id: str):
         self.agent_id = agent_id
         self._config_manager = get_config()
@@ -43,8 +80,12 @@ class BaseAgent(ABC):
         # Initialize LLM with configuration
         self.llm = self._initialize_llm()
         
-        # Initialize tools with proper toolbox
-        self.tool_manager = ToolManager()
+        # Adaptive model cascade state: extra model instances and per-task probe counters
+        self._cascade_llms: Dict[str, ChatAnthropic] = {}
+        self._cascade_call_counts: Dict[str, int] = {}
+        
+        # Tools come from the process-wide pool; agents only hold a view
+        self.tool_manager = tool_pool.get_manager()
         # Create agent-specific toolbox
         self.toolbox = AgentToolbox(self.tool_manager, self.agent_id)
         # Keep backward compatibility with old code
@@ -95,15 +136,21 @@ class BaseAgent(ABC):
         # No need to set up individual handlers here as they're managed centrally
         self.logger.info(f"🤖 Agent {self.agent_id} logging initialized via comprehensive system")
     
-    def _initialize_llm(self) -> ChatAnthropic:
-        """Initialize the LangChain LLM with agent-specific configuration."""
+    def _initialize_llm(self, overrides: Optional[Dict[str, Any]] = None) -> ChatAnthropic:
+        """
+        Initialize the LangChain LLM with agent-specific configuration.
+        
+        Args:
+            overrides: Optional model/temperature/max_tokens overrides, used for
+                       additional models such as the cascade's fast tier
+        """
         try:
             # Get LLM configuration (primary by default, with agent-specific overrides)
             llm_config = self._config_manager.get_llm_config()
             agent_llm_config = self.agent_config.get('llm', {})
             
-            # Merge configurations (agent-specific overrides global)
-            final_config = {**llm_config, **agent_llm_config}
+            # Merge configurations (agent-specific overrides global, call overrides both)
+            final_config = {**llm_config, **agent_llm_config, **(overrides or {})}
             
             # Get API key from environment
             api_key_env = final_config.get('api_key_env', 'ANTHROPIC_API_KEY')
@@ -138,12 +185,13 @@ class BaseAgent(ABC):
             
             self.logger.debug(f"Initializing LLM for agent {self.agent_id} with model {final_config.get('model', default_model)}")
             
-            # Create ChatAnthropic instance with appropriate configuration
-            return ChatAnthropic(
+            # Get a shared ChatAnthropic view backed by the pooled HTTP client
+            return llm_client_pool.get_chat_model(
                 model=final_config.get("model", default_model),
                 temperature=final_config.get("temperature", default_temperature),
                 max_tokens=final_config.get("max_tokens", default_max_tokens),
-                anthropic_api_key=api_key
+                api_key=api_key,
+                base_url=final_config.get("base_url")
             )
         except Exception as e:
             import traceback
@@ -477,7 +525,9 @@ class BaseAgent(ABC):
         return {aid: state for aid, state in all_agents.items() if aid != self.agent_id}
     
     @track_function(log_args=True, log_return=True)
-    async def think(self, prompt: str, context: Dict[str, Any] = None, task_complexity: str = "normal") -> str:
+    @span_tracer.traced("think", "llm")
+    async def think(self, prompt: str, context: Dict[str, Any] = None, task_complexity: str = "normal",
+                    task_type: Optional[str] = None, expects_files: bool = False) -> str:
         """
         Enhanced think method with better context and retry logic for LLM interactions.
         
@@ -486,6 +536,10 @@ class BaseAgent(ABC):
             context: Optional additional context for the LLM
             task_complexity: Complexity of the task ("low", "normal", "high")
                              affects model selection and parameters
+            task_type: Optional task label used to learn model cascade escalation rates;
+                       defaults to the agent task being executed and the complexity
+            expects_files: Whether the response must parse into files; a fast-tier
+                           response that does not parse is escalated
         
         Returns:
             Generated response from the LLM
@@ -547,14 +601,23 @@ class BaseAgent(ABC):
         error = None
         response_content = ""
         
-        for attempt in range(max_retries):
+        # Adaptive model cascade: accept a fast-tier answer when it validates
+        cascade_result = await self._run_model_cascade(
+            messages, prompt, task_complexity,
+            task_type or f"{_current_task_type.get() or 'think'}:{task_complexity}",
+            expects_files, interaction_id
+        )
+        if cascade_result is not None:
+            response, response_content, model, temperature, max_tokens = cascade_result
+        
+        for attempt in range(0 if cascade_result is not None else max_retries):
             try:
                 # Log attempt
                 self.logger.info(f"🧠 LLM attempt {attempt + 1}/{max_retries} for interaction [{interaction_id}]")
                 
                 # Use safe_execute_with_retry for resilient LLM calls
                 async def _llm_call():
-                    return await self.llm.ainvoke(messages)
+                    return await self._invoke_llm(self.llm, messages, expects_files)
                 
                 response = await self.safe_execute_with_retry(_llm_call, max_retries=2)
                 response_content = response.content if response else ""
@@ -595,6 +658,10 @@ class BaseAgent(ABC):
         
         duration = time.time() - start_time
         
+        if expects_files:
+            output_mode = (getattr(response, "response_metadata", None) or {}).get("output_mode", "text")
+            file_responses_total.inc(agent=self.agent_id, mode=output_mode)
+        
         # Extract token usage if available
         token_usage = self._extract_token_usage(response)
         
@@ -639,6 +706,211 @@ class BaseAgent(ABC):
         
         return processed_response
         
+    async def _invoke_llm(self, llm: ChatAnthropic, messages: List[Any], expects_files: bool = False) -> Any:
+        """
+        Invoke an LLM once, hedging the request if it runs past the model's usual latency.
+        
+        Every completed call records its latency so the per-model percentile
+        used as the hedge delay tracks what the model is currently doing.
+        
+        Args:
+            llm: LLM instance to call
+            messages: Messages to send
+            expects_files: Request files through the structured output tool when the model supports it
+        
+        Returns:
+            The LLM response
+        """
+        from utils.llm_logger import llm_logger
+        from utils.request_hedging import hedged_call, hedge_budget
+        from utils.structured_output import supports_structured_output
+        
+        model = getattr(llm, "model", "unknown")
+        structured_config = self._get_structured_output_config()
+        structured = expects_files and structured_config.get("enabled", False) and supports_structured_output(
+            llm, structured_config.get("unsupported_models") or []
+        )
+        
+        async def _timed_invoke():
+            with span_tracer.span("llm.call", "llm", model=model):
+                started = time.time()
+                if structured:
+                    result = await self._invoke_structured(llm, messages, structured_config)
+                else:
+                    result = await llm.ainvoke(messages)
+                llm_logger.record_model_latency(model, time.time() - started)
+                return result
+        
+        hedging_config = self._config_manager.get('agents.llm.hedging', {}) or {}
+        hedge_after = None
+        if hedging_config.get("enabled", False):
+            observed = llm_logger.get_latency_percentile(
+                model,
+                hedging_config.get("percentile", 95),
+                hedging_config.get("min_samples", 20)
+            )
+            if observed is not None:
+                hedge_after = max(observed, hedging_config.get("min_delay", 1.0))
+        
+        return await hedged_call(
+            _timed_invoke, hedge_after, hedge_budget,
+            max_per_minute=hedging_config.get("max_hedges_per_minute", 10),
+            label=f"{self.agent_id} call to {model}"
+        )
+    
+    def _get_structured_output_config(self) -> Dict[str, Any]:
+        """Get structured file output settings, with agent-specific overrides applied."""
+        structured_config = self._config_manager.get('agents.llm.structured_output', {}) or {}
+        agent_structured_config = self.agent_config.get('llm', {}).get('structured_output', {}) or {}
+        return {**structured_config, **agent_structured_config}
+    
+    async def _invoke_structured(self, llm: ChatAnthropic, messages: List[Any],
+                                 structured_config: Dict[str, Any]) -> Any:
+        """
+        Request files through the ``write_files`` tool.
+        
+        A validated tool call comes back as a message whose content is the
+        ``{"files": [...]}`` JSON, so callers parse it like any other response.
+        If the tool call does not validate, the same messages are sent once
+        as a plain request and the text goes through the response parser.
+        
+        Args:
+            llm: LLM instance to call
+            messages: Messages to send
+            structured_config: Structured output settings
+        
+        Returns:
+            The LLM response, with ``output_mode`` in its response metadata
+        """
+        from utils.structured_output import StructuredOutputError, files_response, request_files
+        
+        model = getattr(llm, "model", "unknown")
+        try:
+            files, message = await request_files(
+                llm, messages, stream=structured_config.get("stream_validation", True)
+            )
+        except (StructuredOutputError, NotImplementedError) as e:
+            self.logger.warning(f"⚠️ Structured file output from {model} rejected ({e}); requesting text instead")
+            result = await llm.ainvoke(messages)
+            if isinstance(getattr(result, "response_metadata", None), dict):
+                result.response_metadata["output_mode"] = "fallback"
+            return result
+        
+        self.logger.debug(f"🧾 {len(files)} files received through structured output from {model}")
+        return AIMessage(
+            content=files_response(files),
+            usage_metadata=getattr(message, "usage_metadata", None),
+            response_metadata={**(getattr(message, "response_metadata", None) or {}), "output_mode": "structured"},
+        )
+    
+    def _get_cascade_config(self) -> Dict[str, Any]:
+        """Get model cascade settings, with agent-specific overrides applied."""
+        cascade_config = self._config_manager.get('agents.llm.cascade', {}) or {}
+        agent_cascade_config = self.agent_config.get('llm', {}).get('cascade', {}) or {}
+        return {**cascade_config, **agent_cascade_config}
+    
+    def _get_cascade_llm(self, cascade_config: Dict[str, Any]) -> ChatAnthropic:
+        """Get (creating once) the LLM instance for the cascade's fast tier."""
+        model = cascade_config["fast_model"]
+        if model not in self._cascade_llms:
+            overrides = {"model": model}
+            if cascade_config.get("fast_max_tokens"):
+                overrides["max_tokens"] = cascade_config["fast_max_tokens"]
+            self._cascade_llms[model] = self._initialize_llm(overrides)
+        return self._cascade_llms[model]
+    
+    def _should_skip_fast_tier(self, task_type: str, cascade_config: Dict[str, Any]) -> bool:
+        """
+        Decide whether the fast tier is hopeless for this task type.
+        
+        The fast tier is skipped once its recent escalation rate reaches the
+        threshold, except for a periodic probe so the rate can recover.
+        """
+        from utils.llm_logger import llm_logger
+        
+        rate, samples = llm_logger.get_escalation_rate(
+            self.agent_id, task_type, cascade_config.get("window", 20)
+        )
+        if samples < cascade_config.get("min_samples", 5) or rate < cascade_config.get("skip_threshold", 0.8):
+            return False
+        
+        count = self._cascade_call_counts.get(task_type, 0) + 1
+        self._cascade_call_counts[task_type] = count
+        probe_interval = cascade_config.get("probe_interval", 10)
+        if probe_interval and count % probe_interval == 0:
+            self.logger.debug(f"🪜 Probing fast tier for {task_type} (escalation rate {rate:.0%})")
+            return False
+        return True
+    
+    def _response_has_files(self, response: str) -> bool:
+        """Check that a response parses into files with the shared response parser."""
+        from utils.enhancedLLMResponseParser import parse_llm_response_for_agent
+        
+        try:
+            files, error = parse_llm_response_for_agent(self, response, {"validation": "model_cascade"})
+        except Exception as e:
+            self.logger.debug(f"🔍 Cascade parse check failed: {e}")
+            return False
+        return bool(files) and not error
+    
+    async def _run_model_cascade(self, messages: List[Any], prompt: str, task_complexity: str,
+                                 task_type: str, expects_files: bool,
+                                 interaction_id: str) -> Optional[tuple]:
+        """
+        Try the cascade's fast tier before the agent's primary model.
+        
+        Args:
+            messages: Messages prepared for the LLM
+            prompt: Original prompt, used for response validation
+            task_complexity: Complexity of the task; only eligible complexities cascade
+            task_type: Task label used for escalation statistics
+            expects_files: Whether the response must also parse into files
+            interaction_id: Interaction ID for logging
+        
+        Returns:
+            (response, content, model, temperature, max_tokens) when the fast
+            tier's answer is accepted, or None to escalate to the primary model
+        """
+        from utils.llm_logger import llm_logger
+        
+        cascade_config = self._get_cascade_config()
+        if not cascade_config.get("enabled", False):
+            return None
+        if task_complexity not in cascade_config.get("eligible_complexities", ["low", "normal"]):
+            return None
+        
+        fast_model = cascade_config.get("fast_model")
+        if not fast_model or fast_model == getattr(self.llm, "model", None):
+            return None
+        
+        if self._should_skip_fast_tier(task_type, cascade_config):
+            llm_logger.record_cascade_skip(self.agent_id, task_type)
+            self.logger.debug(f"🪜 Skipping fast tier for {task_type} [{interaction_id}]")
+            return None
+        
+        try:
+            fast_llm = self._get_cascade_llm(cascade_config)
+            response = await asyncio.wait_for(
+                self._invoke_llm(fast_llm, messages, expects_files), timeout=cascade_config.get("fast_timeout", 60)
+            )
+            content = response.content if response else ""
+        except Exception as e:
+            self.logger.warning(f"⚠️ Fast tier {fast_model} failed [{interaction_id}]: {e}")
+            response, content = None, ""
+        
+        accepted = self._is_valid_response(content, prompt) and (
+            not expects_files or self._response_has_files(content)
+        )
+        llm_logger.record_cascade_outcome(self.agent_id, task_type, fast_model, escalated=not accepted)
+        
+        if not accepted:
+            self.logger.info(f"🪜 Escalating {task_type} from {fast_model} to primary model [{interaction_id}]")
+            return None
+        
+        self.logger.info(f"✅ Fast tier {fast_model} response accepted [{interaction_id}]")
+        return (response, content, fast_model,
+                getattr(fast_llm, "temperature", None), getattr(fast_llm, "max_tokens", None))
+    
     def _select_model_config(self, task_complexity: str) -> Dict[str, Any]:
         """Select appropriate model configuration based on task complexity."""
         # Get agent-specific LLM config
@@ -1095,6 +1367,160 @@ Please contact the system administrator if this problem continues.
             
         return result
     
+    async def request_file_edits(self, instruction: str, files: Dict[str, str],
+                                 context: Dict[str, Any] = None, edit_kind: str = "edit",
+                                 allow_raw_response: bool = False) -> Dict[str, str]:
+        """
+        Ask the LLM for patch-style edits to files and apply them.
+        
+        The model is asked for search/replace blocks or unified diffs instead of
+        whole files. Files whose hunks conflict are re-requested as full files,
+        and a response without any edits is treated as full-file output.
+        
+        Args:
+            instruction: What should be changed
+            files: Mapping of file path to current content
+            context: Optional additional context for the LLM
+            edit_kind: Label for logging and savings reports
+            allow_raw_response: For a single file, accept a bare code response
+                                when it contains neither edits nor parseable files
+        
+        Returns:
+            Mapping of file path to updated content, for files that changed
+        """
+        from utils.llm_logger import llm_logger
+        from utils.patch_applier import (
+            apply_hunks, build_edit_prompt, build_full_file_prompt,
+            group_hunks_by_file, parse_edit_response
+        )
+        
+        started = time.time()
+        response = await self.think(build_edit_prompt(instruction, files), context,
+                                    task_type=f"edit:{edit_kind}")
+        duration = time.time() - started
+        
+        hunks = parse_edit_response(response)
+        if not hunks:
+            self.logger.info(f"✂️ No edit hunks in {edit_kind} response, using full-file output")
+            updated = self._files_from_full_response(response, files, allow_raw_response)
+            llm_logger.record_edit_savings(
+                self.agent_id, edit_kind, "full_file", len(updated), len(response),
+                sum(len(content) for content in updated.values()), duration
+            )
+            return updated
+        
+        grouped, unknown = group_hunks_by_file(hunks, list(files))
+        if unknown:
+            self.logger.warning(f"⚠️ Ignoring edits for unknown files: {unknown}")
+        
+        updated: Dict[str, str] = {}
+        conflicted: List[str] = []
+        conflict_count = 0
+        for path, file_hunks in grouped.items():
+            result = apply_hunks(files[path], file_hunks)
+            if result.conflicts:
+                conflict_count += len(result.conflicts)
+                conflicted.append(path)
+                self.logger.warning(f"⚠️ Patch conflicts in {path}: {'; '.join(result.conflicts)}")
+            elif result.content != files[path]:
+                updated[path] = result.content
+        
+        if updated:
+            llm_logger.record_edit_savings(
+                self.agent_id, edit_kind, "patch", len(updated), len(response),
+                sum(len(content) for content in updated.values()), duration, conflict_count
+            )
+        
+        if conflicted:
+            # Patches that do not apply cleanly are redone as full files rather than partially applied
+            conflicted_files = {path: files[path] for path in conflicted}
+            started = time.time()
+            response = await self.think(build_full_file_prompt(instruction, conflicted_files), context,
+                                        task_type=f"edit_fallback:{edit_kind}", expects_files=True)
+            fallback = self._files_from_full_response(response, conflicted_files, allow_raw_response)
+            llm_logger.record_edit_savings(
+                self.agent_id, edit_kind, "full_file_fallback", len(fallback), len(response),
+                sum(len(content) for content in fallback.values()), time.time() - started, conflict_count
+            )
+            updated.update(fallback)
+        
+        return updated
+    
+    def _read_project_files(self, project_id: str, file_paths: List[str]) -> Dict[str, str]:
+        """
+        Read project files, preferring the copy on disk over the shared state record.
+        
+        Args:
+            project_id: Project the files belong to
+            file_paths: Project-relative file paths
+        
+        Returns:
+            Mapping of file path to content for the files that could be read
+        """
+        project = shared_state.get_project_state(project_id) if project_id else None
+        project_path = getattr(project, "project_path", None)
+        recorded = getattr(project, "files_created", None) or {}
+        
+        contents: Dict[str, str] = {}
+        for file_path in file_paths:
+            full_path = os.path.join(project_path, file_path) if project_path else None
+            if full_path and os.path.isfile(full_path):
+                try:
+                    with open(full_path, "r", encoding="utf-8") as f:
+                        contents[file_path] = f.read()
+                    continue
+                except OSError as e:
+                    self.logger.debug(f"Could not read {full_path}: {e}")
+            if file_path in recorded:
+                contents[file_path] = recorded[file_path]
+        return contents
+    
+    def _write_project_file(self, project_id: str, file_path: str, content: str) -> bool:
+        """
+        Write an updated project file to disk and record it in shared state.
+        
+        Args:
+            project_id: Project the file belongs to
+            file_path: Project-relative file path
+            content: New file content
+        
+        Returns:
+            True if the file was written
+        """
+        project = shared_state.get_project_state(project_id) if project_id else None
+        if project is None:
+            self.logger.error(f"❌ Cannot write {file_path}: project {project_id} not found")
+            return False
+        
+        try:
+            if project.project_path:
+                full_path = os.path.join(project.project_path, file_path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+            shared_state.add_file_to_project(project_id, file_path, content)
+            return True
+        except (OSError, ValueError) as e:
+            self.logger.error(f"❌ Failed to write {file_path}: {e}")
+            return False
+    
+    def _files_from_full_response(self, response: str, files: Dict[str, str],
+                                  allow_raw_response: bool = False) -> Dict[str, str]:
+        """Match full-file output in a response back to the requested files."""
+        from utils.enhancedLLMResponseParser import EnhancedLLMResponseParser
+        from utils.generation_coalescer import GenerationRequest, split_batch_response
+        from utils.patch_applier import extract_code_block
+        
+        requests = [GenerationRequest(file_path=path, prompt="") for path in files]
+        matched = split_batch_response(EnhancedLLMResponseParser(self.logger), response, requests,
+                                       {"task_type": "full_file_edit"})
+        if not matched and allow_raw_response and len(files) == 1:
+            content = extract_code_block(self._post_process_response(response))
+            if content.strip():
+                matched = {requests[0].file_path: content}
+        
+        return {path: content for path, content in matched.items() if content != files[path]}
+    
     async def execute_tool(self, tool_name: str, operation: str = None, **kwargs) -> ToolResult:
         """
         Execute a tool with the given parameters.
@@ -1854,17 +2280,17 @@ Please contact the system administrator if this problem continues.
         except Exception as e:
             self.logger.error(f"Error during agent cleanup: {e}")
 
-class AgentToolbox:
+class AgentToolbox(PooledToolbox):
     """Extension of the tool management for agents."""
     
-    def __init__(self, tool_manager, agent_id):
-        self.tool_manager = tool_manager
+    def __init__(self, tool_manager, agent_id, pool=None):
+        super().__init__(tool_manager, agent_id, pool)
         self.agent_id = agent_id
         
     @track_function(log_args=True, log_return=True)
     async def execute(self, tool_name, **kwargs):
         """Execute a tool with the given parameters."""
-        return await self.tool_manager.execute_tool(tool_name, **kwargs)
+        return await self.manager_for(kwargs.get("project_path")).execute_tool(tool_name, **kwargs)
         
     def list_available_tools(self):
         """List tools available to this agent."""
@@ -704,11 +704,11 @@ class DocumentationAgent(BaseAgent):
         """Generate comprehensive code comments."""
         code = data.get("code", "")
         file_type = data.get("file_type", "dart")
+        file_path = data.get("file_path", f"code.{file_type}")
         
         comments_prompt = f"""
-        Add comprehensive code comments to this {file_type} code:
-        
-        {code}
+        Add comprehensive code comments to this {file_type} code.
+        Only insert comments; do not change the code itself.
         
         Add:
         1. Class-level documentation
@@ -723,10 +723,11 @@ class DocumentationAgent(BaseAgent):
         Make comments helpful and informative.
         """
         
-        commented_code = await self.think(comments_prompt, {
-            "code": code,
+        # Comments are returned as patch edits so the model does not re-emit the whole file
+        updated = await self.request_file_edits(comments_prompt, {file_path: code}, {
             "file_type": file_type
-        })
+        }, edit_kind="code_comments", allow_raw_response=True)
+        commented_code = updated.get(file_path, code)
         
         return {
             "original_code": code,
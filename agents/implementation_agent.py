@@ -14,7 +14,9 @@ from .base_agent import BaseAgent
 from shared.state import shared_state, AgentStatus, MessageType
 from tools import ToolResult, ToolStatus
 from utils.enhancedLLMResponseParser import EnhancedLLMResponseParser
+from utils.generation_coalescer import GenerationRequest, plan_batches, build_batch_prompt, split_batch_response
 from utils.function_logger import track_function
+from utils.metrics import file_ingests_total
 from utils.file_creation_fix import apply_file_creation_fixes
 
 class ImplementationAgent(BaseAgent):
@@ -227,7 +229,7 @@ class ImplementationAgent(BaseAgent):
         implementation_result = await self.think(implementation_prompt, {
             "task_data": task_data,
             "project_id": project_id
-        })
+        }, task_type="implement_feature", expects_files=True)
         
         # Parse and create the generated files
         generated_files = []
@@ -274,18 +276,22 @@ class ImplementationAgent(BaseAgent):
         pass  # All code generation should be done via LLM agents
         return []
     
-    async def _add_dependencies(self, dependencies: List[str]) -> None:
-        """Add dependencies to pubspec.yaml using Flutter tool."""
+    async def _add_dependencies(self, dependencies: List[str], dev: bool = False) -> None:
+        """Add a feature's dependencies to pubspec.yaml in one edit and one resolution."""
         self.logger.info(f"📦 Adding dependencies: {dependencies}")
         
-        # Use Flutter tool to add packages
-        add_result = await self.execute_tool("flutter", operation="pub_add", packages=dependencies)
+        # One pub_add call covers the whole batch, including pub get
+        add_result = await self.execute_tool(
+            "flutter",
+            operation="pub_add",
+            packages=dependencies,
+            dev=dev,
+            project_path=getattr(self, '_current_project_path', None)
+        )
         
         if add_result.status.value == "success":
-            self.logger.info("✅ Dependencies added successfully")
-            
-            # Run pub get to install dependencies
-            await self.execute_tool("flutter", operation="pub_get")
+            resolution = (add_result.data or {}).get("resolution")
+            self.logger.info(f"✅ Dependencies added successfully (resolution: {resolution})")
         else:
             self.logger.error(f"❌ Failed to add dependencies: {add_result.error}")
 
@@ -333,7 +339,7 @@ class ImplementationAgent(BaseAgent):
         models_code = await self.think(models_prompt, {
             "entities": entities,
             "project": shared_state.get_project_state(project_id)
-        })
+        }, task_type="generate_models", expects_files=True)
         
         files_created = await self._parse_and_create_files(project_id, models_code)
         
@@ -388,7 +394,7 @@ class ImplementationAgent(BaseAgent):
             "screens": screens,
             "design_system": design_system,
             "project": shared_state.get_project_state(project_id)
-        })
+        }, task_type="create_screens", expects_files=True)
         
         files_created = await self._parse_and_create_files(project_id, screens_code)
         
@@ -444,7 +450,7 @@ class ImplementationAgent(BaseAgent):
             "solution": solution,
             "features": features,
             "project": shared_state.get_project_state(project_id)
-        })
+        }, task_type="state_management", expects_files=True)
         
         files_created = await self._parse_and_create_files(project_id, state_code)
         
@@ -688,7 +694,7 @@ Generate the JSON for the "{project_name}" application now.
                 "project_name": project_name,
                 "architecture": architecture_style,
                 "sanitized_name": sanitized_project_name
-            })
+            }, task_type="project_structure", expects_files=True)
             
             # Parse and create files from LLM response
             generated_files = await self._parse_and_create_files(project_id, project_files_response)
@@ -714,7 +720,7 @@ Generate the JSON for the "{project_name}" application now.
                 "existing_files": files_created,
                 "project_name": project_name,
                 "architecture": architecture_style
-            })
+            }, task_type="critical_files", expects_files=True)
             
             # Parse and create any additional critical files
             additional_files = await self._parse_and_create_files(project_id, critical_files_response)
@@ -761,6 +767,7 @@ Generate the JSON for the "{project_name}" application now.
         })
         
         # If parsing failed, try asking LLM to reformat
+        outcome = "parsed"
         if not parsed_files and error:
             self.logger.warning(f"⚠️ Initial parsing failed: {error}")
             
@@ -793,7 +800,7 @@ Ensure:
                 reformatted = await self.think(reformat_prompt, {
                     "original_response": code_content,
                     "parse_error": error
-                })
+                }, expects_files=True)
                 
                 # Try parsing the reformatted response
                 parsed_files, error = parser.parse_llm_response(reformatted, {
@@ -807,6 +814,8 @@ Ensure:
                     self.logger.error(f"❌ Reformatting failed: {error}")
             except Exception as e:
                 self.logger.error(f"❌ Error during reformatting: {e}")
+            outcome = "reformatted" if parsed_files else "failed"
+        file_ingests_total.inc(agent=self.agent_id, outcome=outcome)
         
         # Create the actual files
         created_files = []
@@ -946,7 +955,7 @@ Ensure:
 
     def _get_repository_template(self, repo_name: str) -> str:
         """REMOVED: No hardcoded repository templates - use LLM generation only."""
-        raise NotImplementedError("Use LLM generation via _generate_repository_code() instead")
+        raise NotImplementedError("Use LLM generation via self.think() instead")
 
     def _get_service_template(self, service_name: str) -> str:
         """REMOVED: No hardcoded service templates - use LLM generation only."""
@@ -965,8 +974,7 @@ Ensure:
             project_data = {"project_id": project_id, "name": feature_name}
             await self._ensure_flutter_project_exists(project_data)
             
-            created_files = []
-            
+            requests = []
             for model in models:
                 model_prompt = f"""
                 Generate a complete Flutter data model for {feature_name} feature.
@@ -988,19 +996,15 @@ Ensure:
                 Return complete, production-ready Dart code.
                 """
                 
-                model_code = await self.think(model_prompt, {
-                    "feature": feature_name,
-                    "model": model
-                })
-                
-                # Create model file
                 model_name = model.get("name", "unknown_model")
-                file_path = f"lib/features/{feature_name.lower()}/data/models/{model_name.lower()}_model.dart"
-                
-                if await self._create_file_with_content(file_path, model_code):
-                    created_files.append(file_path)
+                requests.append(GenerationRequest(
+                    file_path=f"lib/features/{feature_name.lower()}/data/models/{model_name.lower()}_model.dart",
+                    prompt=model_prompt,
+                    context={"feature": feature_name, "model": model}
+                ))
             
-            return created_files
+            generated = await self._generate_coalesced(feature_name, requests)
+            return await self._create_generated_files(requests, generated)
             
         except Exception as e:
             self.logger.error(f"❌ Error creating feature models: {e}")
@@ -1017,7 +1021,7 @@ Ensure:
             project_data = {"project_id": project_id, "name": feature_name}
             await self._ensure_flutter_project_exists(project_data)
             
-            created_files = []
+            requests = []
             
             # Generate screens
             for screen in screens:
@@ -1041,16 +1045,12 @@ Ensure:
                 Return complete, production-ready Dart code.
                 """
                 
-                screen_code = await self.think(screen_prompt, {
-                    "feature": feature_name,
-                    "screen": screen
-                })
-                
                 screen_name = screen.get("name", "unknown_screen")
-                file_path = f"lib/features/{feature_name.lower()}/presentation/pages/{screen_name.lower()}_page.dart"
-                
-                if await self._create_file_with_content(file_path, screen_code):
-                    created_files.append(file_path)
+                requests.append(GenerationRequest(
+                    file_path=f"lib/features/{feature_name.lower()}/presentation/pages/{screen_name.lower()}_page.dart",
+                    prompt=screen_prompt,
+                    context={"feature": feature_name, "screen": screen}
+                ))
             
             # Generate custom widgets
             for widget in widgets:
@@ -1071,18 +1071,15 @@ Ensure:
                 Return complete, production-ready Dart code.
                 """
                 
-                widget_code = await self.think(widget_prompt, {
-                    "feature": feature_name,
-                    "widget": widget
-                })
-                
                 widget_name = widget.get("name", "unknown_widget")
-                file_path = f"lib/features/{feature_name.lower()}/presentation/widgets/{widget_name.lower()}_widget.dart"
-                
-                if await self._create_file_with_content(file_path, widget_code):
-                    created_files.append(file_path)
+                requests.append(GenerationRequest(
+                    file_path=f"lib/features/{feature_name.lower()}/presentation/widgets/{widget_name.lower()}_widget.dart",
+                    prompt=widget_prompt,
+                    context={"feature": feature_name, "widget": widget}
+                ))
             
-            return created_files
+            generated = await self._generate_coalesced(feature_name, requests)
+            return await self._create_generated_files(requests, generated)
             
         except Exception as e:
             self.logger.error(f"❌ Error creating feature UI: {e}")
@@ -1099,17 +1096,16 @@ Ensure:
             project_data = {"project_id": project_id, "name": feature_name}
             await self._ensure_flutter_project_exists(project_data)
             
-            created_files = []
+            requests = []
             
             # Generate use cases
             for use_case in use_cases:
-                use_case_code = await self._generate_use_case_code(feature_name, use_case)
-                
                 use_case_name = use_case.get("name", "unknown_use_case")
-                file_path = f"lib/features/{feature_name.lower()}/domain/usecases/{use_case_name.lower()}_usecase.dart"
-                
-                if await self._create_file_with_content(file_path, use_case_code):
-                    created_files.append(file_path)
+                requests.append(GenerationRequest(
+                    file_path=f"lib/features/{feature_name.lower()}/domain/usecases/{use_case_name.lower()}_usecase.dart",
+                    prompt=self._build_use_case_prompt(feature_name, use_case),
+                    context={"feature_name": feature_name, "use_case": use_case, "architecture": "clean"}
+                ))
             
             # Generate repository interfaces
             for repo in repositories:
@@ -1129,23 +1125,19 @@ Ensure:
                 Return complete, production-ready Dart code.
                 """
                 
-                repo_interface_code = await self.think(repo_interface_prompt, {
-                    "feature": feature_name,
-                    "repository": repo
-                })
-                
                 repo_name = repo.get("name", "unknown_repository")
-                file_path = f"lib/features/{feature_name.lower()}/domain/repositories/{repo_name.lower()}_repository.dart"
-                
-                if await self._create_file_with_content(file_path, repo_interface_code):
-                    created_files.append(file_path)
+                requests.append(GenerationRequest(
+                    file_path=f"lib/features/{feature_name.lower()}/domain/repositories/{repo_name.lower()}_repository.dart",
+                    prompt=repo_interface_prompt,
+                    context={"feature": feature_name, "repository": repo}
+                ))
                 
                 # Generate repository implementation
-                repo_impl_code = await self._generate_repository_code(feature_name, repo)
-                impl_file_path = f"lib/features/{feature_name.lower()}/data/repositories/{repo_name.lower()}_repository_impl.dart"
-                
-                if await self._create_file_with_content(impl_file_path, repo_impl_code):
-                    created_files.append(impl_file_path)
+                requests.append(GenerationRequest(
+                    file_path=f"lib/features/{feature_name.lower()}/data/repositories/{repo_name.lower()}_repository_impl.dart",
+                    prompt=self._build_repository_prompt(feature_name, repo),
+                    context={"feature_name": feature_name, "specification": repo, "architecture": "clean"}
+                ))
             
             # Generate entities
             entities = feature.get("entities", [])
@@ -1167,18 +1159,15 @@ Ensure:
                 Return complete, production-ready Dart code.
                 """
                 
-                entity_code = await self.think(entity_prompt, {
-                    "feature": feature_name,
-                    "entity": entity
-                })
-                
                 entity_name = entity.get("name", "unknown_entity")
-                file_path = f"lib/features/{feature_name.lower()}/domain/entities/{entity_name.lower()}_entity.dart"
-                
-                if await self._create_file_with_content(file_path, entity_code):
-                    created_files.append(file_path)
+                requests.append(GenerationRequest(
+                    file_path=f"lib/features/{feature_name.lower()}/domain/entities/{entity_name.lower()}_entity.dart",
+                    prompt=entity_prompt,
+                    context={"feature": feature_name, "entity": entity}
+                ))
             
-            return created_files
+            generated = await self._generate_coalesced(feature_name, requests)
+            return await self._create_generated_files(requests, generated)
             
         except Exception as e:
             self.logger.error(f"❌ Error creating feature logic: {e}")
@@ -1400,10 +1389,9 @@ Ensure:
             self.logger.error(f"❌ Error creating basic Flutter app: {e}")
             return []
 
-    async def _generate_repository_code(self, feature_name: str, repo_spec: Dict[str, Any]) -> str:
-        """Generate repository implementation code using LLM only."""
-        try:
-            repository_prompt = f"""
+    def _build_repository_prompt(self, feature_name: str, repo_spec: Dict[str, Any]) -> str:
+        """Build the repository implementation generation prompt."""
+        return f"""
             Generate a complete Flutter repository implementation for the {feature_name} feature.
             
             Repository Specification:
@@ -1426,23 +1414,10 @@ Ensure:
             
             Return complete, production-ready Dart code.
             """
-            
-            repository_code = await self.think(repository_prompt, {
-                "feature_name": feature_name,
-                "specification": repo_spec,
-                "architecture": "clean"
-            })
-            
-            return repository_code
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error generating repository code: {e}")
-            return f"// Error generating repository code: {e}"
 
-    async def _generate_use_case_code(self, feature_name: str, use_case: Dict[str, Any]) -> str:
-        """Generate use case implementation code using LLM only."""
-        try:
-            use_case_prompt = f"""
+    def _build_use_case_prompt(self, feature_name: str, use_case: Dict[str, Any]) -> str:
+        """Build the use case generation prompt."""
+        return f"""
             Generate a complete Flutter use case implementation for the {feature_name} feature.
             
             Use Case Specification:
@@ -1466,22 +1441,15 @@ Ensure:
             
             Return complete, production-ready Dart code.
             """
-            
-            use_case_code = await self.think(use_case_prompt, {
-                "feature_name": feature_name,
-                "use_case": use_case,
-                "architecture": "clean"
-            })
-            
-            return use_case_code
-            
-        except Exception as e:
-            self.logger.error(f"❌ Error generating use case code: {e}")
-            return f"// Error generating use case code: {e}"
 
     async def _generate_bloc_files(self, feature_name: str, logic_spec: Dict[str, Any]) -> List[str]:
         """Generate BLoC files for a feature using LLM only."""
         try:
+            feature_path = f"lib/features/{feature_name.lower()}/presentation/bloc"
+            events_file = f"{feature_path}/{feature_name.lower()}_event.dart"
+            states_file = f"{feature_path}/{feature_name.lower()}_state.dart"
+            bloc_file = f"{feature_path}/{feature_name.lower()}_bloc.dart"
+            
             # Generate BLoC events
             events_prompt = f"""
             Generate Flutter BLoC events for the {feature_name} feature.
@@ -1499,11 +1467,6 @@ Ensure:
             Return complete, production-ready Dart code for events.
             """
             
-            events_code = await self.think(events_prompt, {
-                "feature_name": feature_name,
-                "logic_spec": logic_spec
-            })
-            
             # Generate BLoC states
             states_prompt = f"""
             Generate Flutter BLoC states for the {feature_name} feature.
@@ -1522,11 +1485,6 @@ Ensure:
             Return complete, production-ready Dart code for states.
             """
             
-            states_code = await self.think(states_prompt, {
-                "feature_name": feature_name,
-                "logic_spec": logic_spec
-            })
-            
             # Generate BLoC implementation
             bloc_prompt = f"""
             Generate Flutter BLoC implementation for the {feature_name} feature.
@@ -1545,33 +1503,17 @@ Ensure:
             Return complete, production-ready Dart code for BLoC.
             """
             
-            bloc_code = await self.think(bloc_prompt, {
-                "feature_name": feature_name,
-                "logic_spec": logic_spec,
-                "events": events_code,
-                "states": states_code
-            })
-            
-            # Create the files
-            created_files = []
-            feature_path = f"lib/features/{feature_name.lower()}/presentation/bloc"
-            
-            # Create events file
-            events_file = f"{feature_path}/{feature_name.lower()}_event.dart"
-            if await self._create_file_with_content(events_file, events_code):
-                created_files.append(events_file)
-            
-            # Create states file  
-            states_file = f"{feature_path}/{feature_name.lower()}_state.dart"
-            if await self._create_file_with_content(states_file, states_code):
-                created_files.append(states_file)
-            
-            # Create bloc file
-            bloc_file = f"{feature_path}/{feature_name.lower()}_bloc.dart"
-            if await self._create_file_with_content(bloc_file, bloc_code):
-                created_files.append(bloc_file)
+            spec_context = {"feature_name": feature_name, "logic_spec": logic_spec}
+            requests = [
+                GenerationRequest(file_path=events_file, prompt=events_prompt, context=spec_context),
+                GenerationRequest(file_path=states_file, prompt=states_prompt, context=spec_context),
+                # When generated on its own, the BLoC sees the events and states generated above
+                GenerationRequest(file_path=bloc_file, prompt=bloc_prompt, context=spec_context,
+                                  context_from={"events": events_file, "states": states_file})
+            ]
             
-            return created_files
+            generated = await self._generate_coalesced(feature_name, requests)
+            return await self._create_generated_files(requests, generated)
             
         except Exception as e:
             self.logger.error(f"❌ Error generating BLoC files: {e}")
@@ -2133,31 +2075,38 @@ Ensure:
         }
     
     async def _create_rollback_point(self, project_id: str, feature_id: str) -> str:
-        """Create a Git rollback point for the feature."""
+        """Snapshot the project tree as the rollback point for the feature."""
         try:
-            # Create git commit for the feature
-            commit_result = await self.execute_tool(
-                "git",
-                operation="commit",
-                message=f"Implement feature: {feature_id}",
-                add_all=True
-            )
-            
-            if commit_result.status.value == "success":
-                # Get commit hash
-                hash_result = await self.execute_tool(
-                    "git",
-                    operation="get_current_commit_hash"
-                )
-                
-                return hash_result.data.strip() if hash_result.data else "unknown"
-            else:
-                return "commit_failed"
+            manager = self._get_snapshot_manager(project_id)
+            if manager is None:
+                return "rollback_point_failed"
+            
+            snapshot_id = await asyncio.to_thread(manager.snapshot, f"feature:{feature_id}")
+            keep = self.agent_config.get("snapshots", {}).get("keep", 50)
+            if keep:
+                # Rollback points features still refer to survive pruning
+                incremental_state = shared_state.get_incremental_state(project_id)
+                pinned = list(incremental_state.rollback_points.values()) if incremental_state else []
+                await asyncio.to_thread(manager.prune, keep, pinned)
+            self.logger.debug(f"📸 Rollback point {snapshot_id} for feature {feature_id}")
+            return snapshot_id
         
         except Exception as e:
             self.logger.error(f"❌ Failed to create rollback point: {e}")
             return "rollback_point_failed"
     
+    def _get_snapshot_manager(self, project_id: str):
+        """Get the snapshot manager for a project's tree, or None when the project has no path."""
+        from utils.snapshot_manager import DEFAULT_EXCLUDE, get_snapshot_manager
+        
+        project_state = shared_state.get_project_state(project_id)
+        project_path = getattr(project_state, "project_path", None) if project_state else None
+        if not project_path or not os.path.isdir(project_path):
+            self.logger.warning(f"⚠️ No project directory for {project_id}; cannot snapshot")
+            return None
+        exclude = self.agent_config.get("snapshots", {}).get("exclude") or DEFAULT_EXCLUDE
+        return get_snapshot_manager(project_path, exclude)
+    
     async def _handle_feature_validation_failure(self, project_id: str, feature: Dict[str, Any], 
                                                 validation_result: Dict[str, Any]) -> Dict[str, Any]:
         """Handle feature validation failure with retry logic."""
@@ -2201,8 +2150,10 @@ Ensure:
             
             for criterion in failed_criteria:
                 if criterion == "compiles_successfully":
-                    # Try to fix compilation errors
-                    await self._fix_compilation_errors(project_id)
+                    # Try to fix compilation errors reported by the failed analysis
+                    await self._fix_compilation_errors(
+                        project_id, validation_result["criteria_results"][criterion]
+                    )
                 elif criterion == "no_runtime_errors":
                     # Try to fix runtime errors
                     await self._fix_runtime_errors(project_id)
@@ -2212,10 +2163,55 @@ Ensure:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def _fix_compilation_errors(self, project_id: str):
-        """Attempt to fix compilation errors."""
-        # Simplified compilation fix
+    async def _fix_compilation_errors(self, project_id: str,
+                                      compile_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Attempt to fix compilation errors with patch-based edits.
+        
+        Args:
+            project_id: Project to fix
+            compile_result: Result of _validate_compilation; analysis is re-run if omitted
+        
+        Returns:
+            Dictionary with the files that were fixed
+        """
         self.logger.info("🔧 Attempting to fix compilation errors")
+        
+        if compile_result is None:
+            compile_result = await self._validate_compilation(project_id)
+        
+        output = compile_result.get("output") or {}
+        issues = output.get("issues", []) if isinstance(output, dict) else []
+        errors_by_file: Dict[str, List[str]] = {}
+        for issue in issues:
+            if issue.get("severity") != "error":
+                continue
+            match = re.search(r"((?:lib|test)/[\w/.-]+\.dart):(\d+)", issue.get("line", ""))
+            if match:
+                errors_by_file.setdefault(match.group(1), []).append(
+                    f"line {match.group(2)}: {issue.get('message', '')}"
+                )
+        
+        files = self._read_project_files(project_id, list(errors_by_file))
+        if not files:
+            self.logger.info("🔧 No readable files with analyzer errors to fix")
+            return {"fixed_files": []}
+        
+        error_report = "\n".join(
+            f"{path}:\n" + "\n".join(f"  - {error}" for error in errors_by_file[path])
+            for path in files
+        )
+        updated = await self.request_file_edits(
+            f"Fix these Dart analyzer errors with minimal changes:\n{error_report}",
+            files,
+            {"project_id": project_id, "errors": errors_by_file},
+            edit_kind="compilation_fix"
+        )
+        
+        fixed_files = [path for path, content in updated.items()
+                       if await self._create_file_with_content(path, content)]
+        self.logger.info(f"🔧 Fixed {len(fixed_files)}/{len(files)} files with compilation errors")
+        return {"fixed_files": fixed_files}
     
     async def _fix_runtime_errors(self, project_id: str):
         """Attempt to fix runtime errors."""
@@ -2223,25 +2219,40 @@ Ensure:
         self.logger.info("🔧 Attempting to fix runtime errors")
     
     async def _rollback_to_previous_state(self, project_id: str, feature_id: str) -> Dict[str, Any]:
-        """Rollback to the previous state before feature implementation."""
+        """
+        Rollback to the feature's rollback point, or to the latest one when the
+        feature never completed (the state before it was implemented).
+        """
         try:
             incremental_state = shared_state.get_incremental_state(project_id)
-            
-            if incremental_state and feature_id in incremental_state.rollback_points:
-                rollback_hash = incremental_state.rollback_points[feature_id]
-                
-                # Perform git rollback
-                rollback_result = await self.execute_tool(
-                    "git",
-                    operation="reset_hard",
-                    commit_hash=rollback_hash
+            if not incremental_state or not incremental_state.rollback_points:
+                return {"success": False, "reason": "No rollback point found"}
+            
+            rollback_id = incremental_state.rollback_points.get(feature_id)
+            if rollback_id is None:
+                rollback_id = list(incremental_state.rollback_points.values())[-1]
+            
+            manager = self._get_snapshot_manager(project_id)
+            if manager is not None and manager.has_snapshot(rollback_id):
+                restored = await asyncio.to_thread(manager.restore, rollback_id)
+                self.logger.info(
+                    f"🔄 Rolled back feature {feature_id} to snapshot {rollback_id} "
+                    f"({restored['written']} written, {restored['deleted']} deleted in {restored['seconds']:.2f}s)"
                 )
-                
-                if rollback_result.status.value == "success":
-                    self.logger.info(f"🔄 Rolled back feature {feature_id} to {rollback_hash}")
-                    return {"success": True, "rollback_hash": rollback_hash}
+                return {"success": True, "snapshot_id": rollback_id, "restored": restored}
+            
+            # Rollback points recorded before snapshots existed are git commits
+            rollback_result = await self.execute_tool(
+                "git",
+                operation="reset_hard",
+                commit_hash=rollback_id
+            )
             
-            return {"success": False, "reason": "No rollback point found"}
+            if rollback_result.status.value == "success":
+                self.logger.info(f"🔄 Rolled back feature {feature_id} to {rollback_id}")
+                return {"success": True, "rollback_hash": rollback_id}
+            
+            return {"success": False, "reason": f"Could not restore rollback point {rollback_id}"}
         
         except Exception as e:
             self.logger.error(f"❌ Rollback failed: {e}")
@@ -2549,6 +2560,67 @@ Ensure:
         
         return improvements.get(issue_type.lower(), {"general": "5-15% performance improvement"})
     
+    async def _generate_coalesced(self, feature_name: str, requests: List[GenerationRequest]) -> Dict[str, str]:
+        """
+        Generate several small files for a feature with as few LLM calls as possible.
+        
+        Requests are batched into structured multi-file prompts (bounded by file
+        count and combined prompt size) and the response is split back per file.
+        Any file the combined response does not yield is generated individually.
+        
+        Args:
+            feature_name: Feature the files belong to
+            requests: Files to generate, in order
+            
+        Returns:
+            Mapping of file path to generated content
+        """
+        coalescing_config = self.agent_config.get('coalescing', {})
+        if coalescing_config.get('enabled', True):
+            batches = plan_batches(
+                requests,
+                coalescing_config.get('max_files_per_batch', 6),
+                coalescing_config.get('max_batch_chars', 12000)
+            )
+        else:
+            batches = [[request] for request in requests]
+        
+        generated: Dict[str, str] = {}
+        for batch in batches:
+            if len(batch) > 1:
+                try:
+                    self.logger.info(f"📦 Coalescing {len(batch)} file generations for {feature_name}")
+                    response = await self.think(build_batch_prompt(feature_name, batch), {
+                        "feature": feature_name,
+                        "files": [request.file_path for request in batch]
+                    }, task_type="coalesced_generation", expects_files=True)
+                    split = split_batch_response(EnhancedLLMResponseParser(self.logger), response, batch)
+                    generated.update(split)
+                    if len(split) < len(batch):
+                        self.logger.warning(
+                            f"⚠️ Combined response covered {len(split)}/{len(batch)} files, generating the rest individually"
+                        )
+                except Exception as e:
+                    self.logger.warning(f"⚠️ Coalesced generation failed for {feature_name}, falling back to individual calls: {e}")
+            
+            for request in batch:
+                if request.file_path in generated:
+                    continue
+                context = dict(request.context)
+                for key, path in request.context_from.items():
+                    context[key] = generated.get(path, "")
+                generated[request.file_path] = await self.think(request.prompt, context)
+        
+        return generated
+
+    async def _create_generated_files(self, requests: List[GenerationRequest], generated: Dict[str, str]) -> List[str]:
+        """Write generated contents for each request, returning the files created."""
+        created_files = []
+        for request in requests:
+            if await self._create_file_with_content(request.file_path, generated.get(request.file_path, "")):
+                created_files.append(request.file_path)
+        return created_files
+
     async def _create_file_with_content(self, file_path: str, content: str) -> bool:
         """Helper method to create a file with LLM-generated content with proper path handling."""
         try:
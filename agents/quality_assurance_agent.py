@@ -7,7 +7,7 @@ import asyncio
 import os
 import re
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, List, Any, Optional, Set, Tuple
 from .base_agent import BaseAgent
 from shared.state import shared_state, AgentStatus, MessageType
 from tools import ToolResult, ToolStatus
@@ -434,7 +434,10 @@ class QualityAssuranceAgent(BaseAgent):
         project_id = task_data["project_id"]
         issues = task_data.get("issues", [])
         
-        fix_coordination_plan = await self._create_fix_plan(issues)
+        # Issues tied to a specific file are fixed in place with patch edits
+        patched_files, remaining_issues = await self._apply_patch_fixes(project_id, issues)
+        
+        fix_coordination_plan = await self._create_fix_plan(remaining_issues) if remaining_issues else []
         
         # Assign fix tasks to appropriate agents
         for fix_task in fix_coordination_plan:
@@ -458,9 +461,61 @@ class QualityAssuranceAgent(BaseAgent):
         return {
             "fix_plan_created": True,
             "tasks_assigned": len(fix_coordination_plan),
-            "target_agents": list(set([task["assigned_agent"] for task in fix_coordination_plan]))
+            "target_agents": list(set([task["assigned_agent"] for task in fix_coordination_plan])),
+            "patched_files": patched_files
         }
     
+    async def _apply_patch_fixes(self, project_id: str,
+                                 issues: List[Dict[str, Any]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Fix file-specific issues directly with patch-based edits.
+        
+        Args:
+            project_id: Project the issues belong to
+            issues: Issues to fix
+        
+        Returns:
+            Tuple of (patched file paths, issues that still need coordinated fixes)
+        """
+        issues_by_file: Dict[str, List[Dict[str, Any]]] = {}
+        remaining: List[Dict[str, Any]] = []
+        for issue in issues:
+            if issue.get("file_path"):
+                issues_by_file.setdefault(issue["file_path"], []).append(issue)
+            else:
+                remaining.append(issue)
+        
+        files = self._read_project_files(project_id, list(issues_by_file))
+        if not files:
+            return [], issues
+        
+        issue_report = "\n".join(
+            f"{path}:\n" + "\n".join(
+                f"  - {issue.get('description', '')}: {str(issue.get('analysis', ''))[:500]}"
+                for issue in issues_by_file[path]
+            )
+            for path in files
+        )
+        try:
+            updated = await self.request_file_edits(
+                f"Fix these quality issues with minimal changes:\n{issue_report}",
+                files,
+                {"project_id": project_id, "issue_count": len(issues)},
+                edit_kind="qa_fix"
+            )
+        except Exception as e:
+            self.logger.warning(f"⚠️ Patch fixes failed, coordinating all issues instead: {e}")
+            return [], issues
+        
+        patched_files = [path for path, content in updated.items()
+                         if self._write_project_file(project_id, path, content)]
+        for path, file_issues in issues_by_file.items():
+            if path not in patched_files:
+                remaining.extend(file_issues)
+        
+        self.logger.info(f"✂️ Patched {len(patched_files)} file(s) for {len(issues) - len(remaining)} issue(s)")
+        return patched_files, remaining
+    
     async def _create_fix_plan(self, issues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Create a coordinated plan to fix all identified issues."""
         fix_plan_prompt = f"""
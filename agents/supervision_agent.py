@@ -5,12 +5,12 @@ Process Supervision Agent - Monitors all development processes, handles failures
 import asyncio
 import uuid
 import time
-import psutil
 import os
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 from .base_agent import BaseAgent
 from shared.state import shared_state, AgentStatus, MessageType, ProcessSupervisionState
+from utils.proc_stats import resource_sampler, read_system_memory_percent, read_disk_percent
 
 
 class ProcessSupervisionAgent(BaseAgent):
@@ -48,6 +48,14 @@ class ProcessSupervisionAgent(BaseAgent):
         self.is_monitoring = False
         self.monitoring_task = None
         
+        # Event-driven scheduling: the loop sleeps until the next supervision deadline
+        # and is woken early when a process is registered
+        self.resource_sample_interval = supervision_config.get('resource_sample_interval', self.health_check_interval)
+        self._wakeup_event: Optional[asyncio.Event] = None
+        self._wakeup_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_resource_sample = 0.0
+        shared_state.subscribe("supervised_process_registered", self._on_supervision_change)
+        
         self.logger.info("🔍 Process Supervision Agent initialized")
     
     async def execute_task(self, task_description: str, task_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -165,7 +173,13 @@ class ProcessSupervisionAgent(BaseAgent):
         return {"status": "monitoring_stopped"}
     
     async def _monitoring_loop(self):
-        """Main monitoring loop that checks process health."""
+        """
+        Main monitoring loop that checks process health.
+        
+        Instead of scanning on a fixed tick, the loop sleeps until the next
+        deadline from the shared state index (a heartbeat going stale or a
+        timeout expiring), or until a new process is registered.
+        """
         from shared.state import CircuitBreaker
         
         # Add circuit breaker to prevent infinite loops
@@ -175,11 +189,15 @@ class ProcessSupervisionAgent(BaseAgent):
             name="supervision_monitoring"
         )
         
+        self._wakeup_loop = asyncio.get_running_loop()
+        self._wakeup_event = asyncio.Event()
+        
         iteration_count = 0
         while self.is_monitoring and circuit_breaker.check():
             try:
+                self._wakeup_event.clear()
                 await self._perform_health_checks()
-                await asyncio.sleep(self.health_check_interval)
+                await self._wait_for_next_deadline()
                 
                 iteration_count += 1
                 # Log status every 100 iterations
@@ -193,13 +211,43 @@ class ProcessSupervisionAgent(BaseAgent):
                 self.logger.error(f"❌ Error in monitoring loop: {e}")
                 await asyncio.sleep(5)  # Brief pause on error
         
+        self._wakeup_event = None
         if not circuit_breaker.check():
             self.logger.warning("⚠️ Supervision monitoring stopped by circuit breaker")
         else:
             self.logger.info("🔍 Supervision monitoring stopped normally")
     
+    def _seconds_until_next_check(self) -> float:
+        """Compute how long the monitoring loop can sleep before the next deadline."""
+        now = time.time()
+        # Resource sampling and re-pinging stuck processes keep a periodic cadence
+        delay = self._last_resource_sample + self.resource_sample_interval - now
+        
+        deadline = shared_state.get_next_supervision_deadline(self.stuck_threshold)
+        if deadline is not None:
+            delay = min(delay, deadline - now)
+        return max(0.05, delay)
+    
+    async def _wait_for_next_deadline(self):
+        """Sleep until the next supervision deadline or an early wakeup."""
+        timeout = self._seconds_until_next_check()
+        try:
+            await asyncio.wait_for(self._wakeup_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    def _on_supervision_change(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Wake the monitoring loop when supervision state changes; may run on any thread."""
+        loop, event = self._wakeup_loop, self._wakeup_event
+        if loop is None or event is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # Loop shut down between the check and the call
+    
     async def _perform_health_checks(self):
-        """Perform comprehensive health checks on all supervised processes."""
+        """Perform health checks on supervised processes whose deadlines have passed."""
         # Check for stuck processes
         stuck_processes = shared_state.get_stuck_processes(self.stuck_threshold)
         for process in stuck_processes:
@@ -210,11 +258,11 @@ class ProcessSupervisionAgent(BaseAgent):
         for process in timeout_processes:
             await self._handle_timeout_process(process)
         
-        # Update resource usage for all running processes
-        await self._update_resource_usage()
-        
-        # Check system health
-        await self._check_system_health()
+        # Resource sampling runs on its own cadence rather than on every wakeup
+        if time.time() - self._last_resource_sample >= self.resource_sample_interval:
+            self._last_resource_sample = time.time()
+            await self._update_resource_usage()
+            await self._check_system_health()
     
     async def _handle_stuck_process(self, process: ProcessSupervisionState):
         """Handle a process that appears stuck."""
@@ -267,25 +315,21 @@ class ProcessSupervisionAgent(BaseAgent):
         self.logger.error(f"🔍 Halted timed-out process {process.process_id} and triggered recovery")
     
     async def _update_resource_usage(self):
-        """Update CPU and memory usage for all supervised processes."""
-        current_process = psutil.Process()
-        
+        """Update CPU and RSS usage for all running supervised processes from /proc."""
         try:
-            # Get system-wide resource usage
-            cpu_percent = psutil.cpu_percent(interval=None)
-            memory = psutil.virtual_memory()
-            
-            # Update process resource usage
-            processes = shared_state.get_supervised_processes()
-            for process_id, process in processes.items():
-                if process.status == "running":
-                    # For now, use system-wide metrics
-                    # In a more sophisticated implementation, we could track per-process usage
-                    shared_state.update_process_heartbeat(
-                        process_id, 
-                        cpu_usage=cpu_percent,
-                        memory_usage=memory.percent
-                    )
+            # Sample each OS process once; many supervised tasks share the agent process
+            samples = {}
+            for process in shared_state.get_running_processes():
+                if process.pid not in samples:
+                    samples[process.pid] = resource_sampler.sample(process.pid)
+                cpu_usage, rss_mb = samples[process.pid]
+                # Resource updates must not refresh the heartbeat, or stuck
+                # processes would never be detected
+                shared_state.update_process_resources(
+                    process.process_id,
+                    cpu_usage=cpu_usage,
+                    memory_usage=rss_mb
+                )
         
         except Exception as e:
             self.logger.debug(f"⚠️ Could not update resource usage: {e}")
@@ -293,23 +337,23 @@ class ProcessSupervisionAgent(BaseAgent):
     async def _check_system_health(self):
         """Check overall system health and resource availability."""
         try:
-            # Check CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
-            if cpu_percent > 90:
+            # Check CPU usage (delta since the previous check, non-blocking)
+            cpu_percent = resource_sampler.system_cpu_percent()
+            if cpu_percent is not None and cpu_percent > 90:
                 self.logger.warning(f"⚠️ High CPU usage detected: {cpu_percent:.1f}%")
                 await self._send_supervision_alert("high_cpu_usage", {"cpu_percent": cpu_percent})
             
             # Check memory usage
-            memory = psutil.virtual_memory()
-            if memory.percent > 85:
-                self.logger.warning(f"⚠️ High memory usage detected: {memory.percent:.1f}%")
-                await self._send_supervision_alert("high_memory_usage", {"memory_percent": memory.percent})
+            memory_percent = read_system_memory_percent()
+            if memory_percent is not None and memory_percent > 85:
+                self.logger.warning(f"⚠️ High memory usage detected: {memory_percent:.1f}%")
+                await self._send_supervision_alert("high_memory_usage", {"memory_percent": memory_percent})
             
             # Check disk space
-            disk = psutil.disk_usage('/')
-            if disk.percent > 90:
-                self.logger.warning(f"⚠️ Low disk space detected: {disk.percent:.1f}% used")
-                await self._send_supervision_alert("low_disk_space", {"disk_percent": disk.percent})
+            disk_percent = read_disk_percent('/')
+            if disk_percent is not None and disk_percent > 90:
+                self.logger.warning(f"⚠️ Low disk space detected: {disk_percent:.1f}% used")
+                await self._send_supervision_alert("low_disk_space", {"disk_percent": disk_percent})
         
         except Exception as e:
             self.logger.debug(f"⚠️ Could not check system health: {e}")
@@ -491,7 +535,8 @@ class ProcessSupervisionAgent(BaseAgent):
             process_id=process_id,
             agent_id=agent_id,
             task_type=task_type,
-            timeout_threshold=timeout_threshold
+            timeout_threshold=timeout_threshold,
+            pid=data.get("pid")
         )
         
         self.logger.info(f"🔍 Registered process {process_id} for supervision (agent: {agent_id}, type: {task_type})")
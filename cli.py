@@ -14,16 +14,13 @@ import signal
 import atexit
 from datetime import datetime
 from pathlib import Path
-from flutter_swarm import FlutterSwarm
 from rich.console import Console
 from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.live import Live
 from rich.panel import Panel
 from config.config_manager import get_config
 
-# Import task management utilities
-from utils.task_manager import task_manager, shutdown_all_tasks
+# The swarm (LangGraph, agents) and task manager are imported by the subcommands
+# that need them, so light commands such as --help and logs start quickly.
 
 # Initialize configuration-aware console
 config = get_config()
@@ -46,7 +43,8 @@ def signal_handler(signum, frame):
     # Try to cancel all tasks
     try:
         loop = asyncio.get_event_loop()
-        if loop.is_running():
+        if loop.is_running() and 'utils.task_manager' in sys.modules:
+            from utils.task_manager import shutdown_all_tasks
             loop.create_task(shutdown_all_tasks(timeout=10.0))
     except Exception:
         pass
@@ -58,9 +56,11 @@ signal.signal(signal.SIGTERM, signal_handler)  # Termination signal
 # Register atexit handler for cleanup
 def cleanup_on_exit():
     """Cleanup function called on exit."""
-    if not _shutdown_initiated:
+    # Nothing to shut down if no subcommand loaded the task manager
+    if not _shutdown_initiated and 'utils.task_manager' in sys.modules:
         print("🔄 Performing final cleanup...")
         try:
+            from utils.task_manager import shutdown_all_tasks
             asyncio.run(shutdown_all_tasks(timeout=5.0))
         except Exception:
             pass
@@ -76,6 +76,11 @@ class FlutterSwarmCLI:
         self.cli_config = self.config.get_cli_config()
         self.display_config = self.config.get_display_config()
         self.messages = self.config.get_messages_config()
+    
+    def _create_swarm(self, **kwargs):
+        """Create the swarm, importing the governance system on first use."""
+        from flutter_swarm import FlutterSwarm
+        return FlutterSwarm(**kwargs)
         
     async def build_project(self, args):
         """Build a new Flutter project (creation is handled automatically)."""
@@ -88,7 +93,7 @@ class FlutterSwarmCLI:
         features = []
         if args.features:
             features = [feat.strip() for feat in args.features.split(',')]
-        self.swarm = FlutterSwarm()
+        self.swarm = self._create_swarm()
         result = await self.swarm.build_project(
             name=args.name,
             description=args.description,
@@ -203,7 +208,7 @@ class FlutterSwarmCLI:
     async def status(self, args):
         """Show project and agent status."""
         if not self.swarm:
-            self.swarm = FlutterSwarm()
+            self.swarm = self._create_swarm()
         
         if args.project_id:
             status = self.swarm.get_project_status(args.project_id)
@@ -289,7 +294,7 @@ class FlutterSwarmCLI:
         console.print("🐝 [bold blue]Starting FlutterSwarm Interactive Mode[/bold blue]")
         console.print("Type 'help' for available commands or 'quit' to exit")
         
-        self.swarm = FlutterSwarm()
+        self.swarm = self._create_swarm()
         
         # Start agents in background
         swarm_task = asyncio.create_task(self.swarm.start())
@@ -431,9 +436,60 @@ class FlutterSwarmCLI:
         
         console.print(table)
     
+    def _print_metrics(self, snapshot: dict, title: str = "Metrics"):
+        """Print histogram percentiles and counter/gauge values from a metrics snapshot."""
+        table = Table(title=title, show_header=True, header_style="bold magenta")
+        table.add_column("Metric", style="cyan")
+        table.add_column("Labels", style="dim")
+        table.add_column("Count / Value", justify="right")
+        table.add_column("p50", justify="right")
+        table.add_column("p90", justify="right")
+        table.add_column("p99", justify="right")
+        table.add_column("Max", justify="right")
+        
+        def seconds(value):
+            if value is None:
+                return "-"
+            return f"{value * 1000:.1f}ms" if value < 1 else f"{value:.2f}s"
+        
+        for name, metric in sorted(snapshot.items()):
+            short_name = name.replace("flutterswarm_", "", 1)
+            for row in metric["series"]:
+                labels = ", ".join(f"{k}={v}" for k, v in row["labels"].items() if v)
+                if metric["type"] == "histogram":
+                    table.add_row(short_name, labels, str(row["count"]), seconds(row.get("p50")),
+                                  seconds(row.get("p90")), seconds(row.get("p99")), seconds(row.get("max")))
+                else:
+                    table.add_row(short_name, labels, f"{row['value']:g}", "", "", "", "")
+        
+        if table.row_count:
+            console.print(table)
+        else:
+            console.print("📈 [dim]No metrics recorded yet[/dim]")
+        
+        ingests = snapshot.get("flutterswarm_file_ingests_total")
+        if ingests and ingests["series"]:
+            from utils.structured_output import reformat_round_trip_rate
+            rate, total = reformat_round_trip_rate(ingests["series"])
+            style = "green" if rate < 0.02 else "yellow" if rate < 0.1 else "red"
+            console.print(f"🔁 Reformat round-trips: [{style}]{rate:.1%}[/{style}] of {total} file responses")
+    
     async def monitor(self, args):
         """Start live monitoring for a project or general system monitoring."""
         from monitoring import live_display, build_monitor, agent_logger
+        from utils.metrics import metrics, parse_prometheus_text
+        
+        if args.metrics_url:
+            # Show metrics served by another FlutterSwarm process
+            import urllib.request
+            try:
+                with urllib.request.urlopen(args.metrics_url, timeout=10) as response:
+                    text = response.read().decode()
+            except Exception as e:
+                console.print(f"❌ [red]Could not read metrics from {args.metrics_url}: {e}[/red]")
+                return
+            self._print_metrics(parse_prometheus_text(text), f"Metrics from {args.metrics_url}")
+            return
         
         if args.project_id:
             # Monitor specific project
@@ -447,9 +503,13 @@ class FlutterSwarmCLI:
         
         # Initialize swarm if needed
         if not self.swarm:
-            self.swarm = FlutterSwarm(enable_monitoring=True)
+            self.swarm = self._create_swarm(enable_monitoring=True)
             await self.swarm.start()
         
+        if args.metrics_port is not None:
+            port = metrics.start_http_server(args.metrics_port)
+            console.print(f"📈 Metrics endpoint: http://127.0.0.1:{port}/metrics")
+        
         try:
             # Start live display
             live_display.start()
@@ -480,6 +540,7 @@ class FlutterSwarmCLI:
         finally:
             # Stop monitoring components
             live_display.stop()
+            self._print_metrics(metrics.snapshot())
             
             if build_monitor.is_monitoring:
                 summary = build_monitor.stop_monitoring()
@@ -500,6 +561,76 @@ class FlutterSwarmCLI:
                 
             await self.swarm.stop()
     
+    def _query_log_store(self, args):
+        """Filter or aggregate events in the indexed log store."""
+        import time
+        from utils.log_store import LogStore, log_store, parse_since
+        
+        # This command only reads; don't add its own traced calls to the store
+        log_store.configure(enabled=False)
+        store = LogStore(config.get('system.logging.store.path', 'logs/flutterswarm_logs.db'), enabled=False)
+        if not store.path.exists():
+            console.print(f"📭 No log store at {store.path}")
+            return
+        
+        started = time.perf_counter()
+        if args.sessions:
+            rows = store.sessions(args.limit)
+            table = Table(title="Log sessions", show_header=True, header_style="bold magenta")
+            for column in ("Session", "Events", "Started", "Ended"):
+                table.add_column(column)
+            for row in rows:
+                table.add_row(row["session"], str(row["events"]),
+                              datetime.fromtimestamp(row["started"]).strftime('%Y-%m-%d %H:%M:%S'),
+                              datetime.fromtimestamp(row["ended"]).strftime('%Y-%m-%d %H:%M:%S'))
+        else:
+            try:
+                filters = dict(session=args.session, agent=args.agent, source=args.source,
+                               event_type=args.type, since=parse_since(args.since), search=args.search)
+            except ValueError as e:
+                console.print(f"❌ {e}")
+                return
+            
+            if args.group_by:
+                try:
+                    rows = store.aggregate(args.group_by, args.limit, **filters)
+                except ValueError as e:
+                    console.print(f"❌ {e}")
+                    return
+                table = Table(title=f"Events by {args.group_by}", show_header=True, header_style="bold magenta")
+                table.add_column(args.group_by.replace("_", " ").title(), style="cyan")
+                for column in ("Count", "Errors", "Total", "Avg", "Max"):
+                    table.add_column(column, justify="right")
+                for row in rows:
+                    table.add_row(str(row["key"]), str(row["count"]), str(row["errors"]),
+                                  f"{row['total_duration']:.2f}s",
+                                  f"{row['avg_duration']:.3f}s" if row["avg_duration"] is not None else "-",
+                                  f"{row['max_duration']:.3f}s" if row["max_duration"] is not None else "-")
+            else:
+                rows = store.query(slowest=bool(args.slowest), limit=args.slowest or args.limit, **filters)
+                title = f"Slowest {len(rows)} events" if args.slowest else f"Latest {len(rows)} events"
+                table = Table(title=title, show_header=True, header_style="bold magenta")
+                table.add_column("Time", style="dim", no_wrap=True)
+                table.add_column("Agent", style="cyan", overflow="fold")
+                table.add_column("Event", overflow="fold")
+                table.add_column("Name", overflow="fold")
+                table.add_column("Duration", justify="right", no_wrap=True)
+                table.add_column("Message", overflow="fold")
+                for row in rows:
+                    message = (row["message"] or "").replace("\n", " ")
+                    table.add_row(
+                        datetime.fromtimestamp(row["ts"]).strftime('%H:%M:%S'),
+                        row["agent"] or "", f"{row['source']}/{row['event_type'] or ''}", row["name"] or "",
+                        f"{row['duration']:.3f}s" if row["duration"] is not None else "",
+                        message[:80] + ("..." if len(message) > 80 else ""),
+                        style="red" if row["status"] in ("error", "failed") else None
+                    )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        console.print(table)
+        console.print(f"[dim]⚡ {len(rows)} row(s) in {elapsed_ms:.1f} ms from {store.path}[/dim]")
+        store.close()
+    
     async def logs(self, args):
         """Show or export logs from previous sessions."""
         from monitoring import agent_logger
@@ -507,7 +638,11 @@ class FlutterSwarmCLI:
         import json
         from pathlib import Path
         
-        if args.export:
+        if (args.sessions or args.group_by or args.slowest or args.agent or args.since or args.session
+                or args.search or args.type or args.source):
+            self._query_log_store(args)
+            
+        elif args.export:
             # Export current session logs
             filename = args.filename or f"flutterswarm_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
             filepath = agent_logger.export_logs_to_json(filename)
@@ -610,15 +745,56 @@ class FlutterSwarmCLI:
             
             console.print(f"\n💡 Use --show to see detailed logs or --export to save them")
 
+    async def trace(self, args):
+        """Show the critical path and top self-time spans of a saved build trace."""
+        from utils.span_tracer import (critical_path, load_trace, resolve_trace_path,
+                                       to_speedscope, top_self_time)
+        
+        path = resolve_trace_path(args.session)
+        if not path:
+            console.print(f"❌ No trace found for session: {args.session}")
+            console.print("💡 Traces are saved to logs/trace_<session>.json after each build")
+            return
+        
+        spans = load_trace(path)
+        if not spans:
+            console.print(f"📭 Trace has no spans: {path}")
+            return
+        console.print(f"📈 [bold]Trace: {path}[/bold] ({len(spans):,} spans)\n")
+        
+        # Critical path of the longest root span (normally the whole build)
+        path_rows = critical_path(spans)
+        build_duration = path_rows[0][1].duration or 1.0
+        path_table = Table(title="Critical path")
+        path_table.add_column("Span")
+        path_table.add_column("Category", style="dim")
+        path_table.add_column("Duration (ms)", justify="right")
+        path_table.add_column("% of build", justify="right")
+        for depth, span in path_rows:
+            path_table.add_row("  " * depth + span.name, span.category,
+                               f"{span.duration / 1000:,.1f}", f"{span.duration / build_duration:.1%}")
+        console.print(path_table)
+        
+        # Where time is spent outside child spans
+        self_table = Table(title=f"Top {args.top} spans by self time")
+        self_table.add_column("Span")
+        self_table.add_column("Category", style="dim")
+        self_table.add_column("Count", justify="right")
+        self_table.add_column("Self (ms)", justify="right")
+        self_table.add_column("Total (ms)", justify="right")
+        for row in top_self_time(spans, args.top):
+            self_table.add_row(row["name"], row["category"], str(row["count"]),
+                               f"{row['self'] / 1000:,.1f}", f"{row['total'] / 1000:,.1f}")
+        console.print(self_table)
+        
+        if args.speedscope:
+            with open(args.speedscope, 'w') as f:
+                json.dump(to_speedscope(spans, name=Path(path).stem), f)
+            console.print(f"📄 speedscope profile written to: {args.speedscope}")
+        console.print(f"💡 Open {path} in chrome://tracing, ui.perfetto.dev or speedscope.app for the full timeline")
+
 def main():
     """Main CLI entry point."""
-    # Initialize comprehensive logging first
-    try:
-        setup_info = setup_comprehensive_logging()
-        print(f"✅ Comprehensive logging initialized - Session ID: {setup_info['session_id']}")
-    except Exception as e:
-        print(f"⚠️ Warning: Could not initialize comprehensive logging: {e}")
-    
     parser = argparse.ArgumentParser(
         description="FlutterSwarm - Multi-Agent Flutter Development System",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -627,6 +803,9 @@ Examples:
   flutter-swarm build MyApp "A todo application"
   flutter-swarm status --project-id abc-123
   flutter-swarm interactive
+  flutter-swarm trace 20250101_120000
+  flutter-swarm monitor --metrics-url http://127.0.0.1:9464/metrics
+  flutter-swarm logs --source llm --slowest 20 --since 2h
         """
     )
     
@@ -650,6 +829,10 @@ Examples:
     # Monitor command
     monitor_parser = subparsers.add_parser('monitor', help='Start live monitoring')
     monitor_parser.add_argument('--project-id', help='Specific project ID to monitor')
+    monitor_parser.add_argument('--metrics-port', type=int,
+                                help='Serve Prometheus metrics on this local port while monitoring')
+    monitor_parser.add_argument('--metrics-url',
+                                help='Show metrics from a running endpoint (e.g. http://127.0.0.1:9464/metrics) and exit')
     
     # Logs command
     logs_parser = subparsers.add_parser('logs', help='Show or export logs')
@@ -658,6 +841,22 @@ Examples:
     logs_parser.add_argument('--list', action='store_true', help='List available log files')
     logs_parser.add_argument('--filename', help='Log file name (for export or display)')
     logs_parser.add_argument('--limit', type=int, default=20, help='Number of log entries to show')
+    logs_parser.add_argument('--agent', help='Only events from this agent (log store query)')
+    logs_parser.add_argument('--source', choices=['agent', 'llm', 'function'], help='Only events from this logger')
+    logs_parser.add_argument('--type', help='Only this event type, e.g. tool_usage or think')
+    logs_parser.add_argument('--since', help='Only events newer than this, e.g. 30m, 2h, 1d or an ISO date')
+    logs_parser.add_argument('--session', help="Only this session ID ('latest' for the most recent build)")
+    logs_parser.add_argument('--search', help='Full-text search in messages, prompts and responses')
+    logs_parser.add_argument('--slowest', type=int, metavar='N', help='Show the N slowest matching events')
+    logs_parser.add_argument('--group-by', choices=['agent', 'event_type', 'name', 'source', 'session', 'status'],
+                             help='Aggregate counts and durations by a column')
+    logs_parser.add_argument('--sessions', action='store_true', help='List sessions in the log store')
+    
+    # Trace command
+    trace_parser = subparsers.add_parser('trace', help='Show the critical path and hot spans of a build trace')
+    trace_parser.add_argument('session', help='Session ID (or trace file) from logs/trace_<session>.json')
+    trace_parser.add_argument('--top', type=int, default=10, help='Number of self-time spans to show')
+    trace_parser.add_argument('--speedscope', help='Also write a speedscope profile to this file')
     
     args = parser.parse_args()
     
@@ -665,6 +864,13 @@ Examples:
         parser.print_help()
         return
     
+    # Initialize comprehensive logging once a command will actually run
+    try:
+        setup_info = setup_comprehensive_logging()
+        print(f"✅ Comprehensive logging initialized - Session ID: {setup_info['session_id']}")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not initialize comprehensive logging: {e}")
+    
     cli = FlutterSwarmCLI()
     
     try:
@@ -678,6 +884,8 @@ Examples:
             asyncio.run(cli.monitor(args))
         elif args.command == 'logs':
             asyncio.run(cli.logs(args))
+        elif args.command == 'trace':
+            asyncio.run(cli.trace(args))
     except KeyboardInterrupt:
         console.print("\n🛑 [yellow]Interrupted by user[/yellow]")
     except Exception as e:
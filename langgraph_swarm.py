@@ -3,9 +3,12 @@ LangGraph-based FlutterSwarm Project Governance System
 This module provides high-level project governance and quality gates while allowing
 agents to collaborate autonomously through the real-time awareness system.
 """
-from typing import Dict, List, Any, Optional, TypedDict, Type
+from typing import Dict, List, Any, Optional, TypedDict, Type, Union
 from datetime import datetime
 import asyncio
+import functools
+import importlib
+import time
 import uuid
 
 # Initialize comprehensive logging first
@@ -14,6 +17,9 @@ from utils.function_logger import track_function, track_tool
 from utils.llm_logger import llm_logger
 from monitoring.agent_logger import agent_logger
 from utils.comprehensive_logging import get_logger
+from utils.span_tracer import span_tracer
+from utils.metrics import gate_seconds
+from utils.lcov import diff_coverage, diff_coverage_settings
 
 # LangGraph imports
 from langgraph.graph import StateGraph, END
@@ -89,13 +95,33 @@ class AgentRegistry:
                                             "AgentRegistry initialization")
     
     @track_function(agent_id="system", log_args=True, log_return=False)
-    def register_agent_class(self, agent_type: str, agent_class: Type) -> None:
-        """Register an agent class with the registry."""
+    def register_agent_class(self, agent_type: str, agent_class: Union[Type, str]) -> None:
+        """
+        Register an agent class with the registry.
+        
+        Args:
+            agent_type: Agent type key used by the gates
+            agent_class: The class itself, or a "module:ClassName" path that is
+                imported the first time the agent is requested
+        """
         self._agent_classes[agent_type] = agent_class
         self.logger.info(f"Registered agent class: {agent_type}")
         agent_logger.log_project_event("system", "agent_registration", 
                                      f"Registered agent class: {agent_type}")
     
+    def _resolve_agent_class(self, agent_type: str) -> Type:
+        """Import a lazily registered agent class and cache it."""
+        agent_class = self._agent_classes[agent_type]
+        if isinstance(agent_class, str):
+            module_path, class_name = agent_class.split(":", 1)
+            agent_class = getattr(importlib.import_module(module_path), class_name)
+            self._agent_classes[agent_type] = agent_class
+        return agent_class
+    
+    def is_instantiated(self, agent_type: str) -> bool:
+        """Check whether an agent instance has been created yet."""
+        return self._agents.get(agent_type) is not None
+    
     @track_function(agent_id="system", log_args=True, log_return=True)
     def get_agent(self, agent_type: str) -> Any:
         """Get or create an agent instance of the specified type."""
@@ -106,7 +132,8 @@ class AgentRegistry:
         # Otherwise, create a new agent instance
         if agent_type in self._agent_classes:
             try:
-                agent_class = self._agent_classes[agent_type]
+                started = time.perf_counter()
+                agent_class = self._resolve_agent_class(agent_type)
                 agent = agent_class()
                 
                 # Apply file creation fixes for Implementation Agent
@@ -119,7 +146,8 @@ class AgentRegistry:
                         self.logger.warning(f"⚠️ Could not apply file creation fixes to {agent_type}: {e}")
                 
                 self._agents[agent_type] = agent
-                self.logger.info(f"Created new agent instance: {agent_type}")
+                self.logger.info(f"Created new agent instance: {agent_type} "
+                                 f"({time.perf_counter() - started:.2f}s)")
                 return agent
             except Exception as e:
                 self.logger.error(f"Failed to create agent {agent_type}: {e}")
@@ -148,7 +176,7 @@ class FlutterSwarmGovernance:
     """
     
     @track_function(agent_id="governance", log_args=True, log_return=False)
-    def __init__(self, enable_monitoring: bool = True):
+    def __init__(self, enable_monitoring: bool = True, eager_agents: Optional[bool] = None):
         # Setup comprehensive logging first
         try:
             setup_info = setup_comprehensive_logging()
@@ -161,13 +189,18 @@ class FlutterSwarmGovernance:
         # Initialize agent registry
         self.agent_registry = AgentRegistry()
         
-        # Register agent classes
+        # Register agent classes; each gate instantiates its agent on first use
         self._register_agent_classes()
 
-        initialized_count = self._initialize_all_agents()
-    
-        if initialized_count < 7:  # Expected number of agents
-            self.logger.warning(f"⚠️ Only {initialized_count} agents initialized. Some agents may not be available.")
+        if eager_agents is None:
+            from config.config_manager import get_config
+            eager_agents = get_config().get('system.performance.eager_agent_initialization', False)
+
+        if eager_agents:
+            initialized_count = self._initialize_all_agents()
+        
+            if initialized_count < 7:  # Expected number of agents
+                self.logger.warning(f"⚠️ Only {initialized_count} agents initialized. Some agents may not be available.")
     
         # Log governance system startup
         agent_logger.log_agent_status_change("governance", AgentStatus.IDLE, AgentStatus.INITIALIZING, 
@@ -287,31 +320,32 @@ class FlutterSwarmGovernance:
         return len(registered_agents)
     
     def _register_agent_classes(self):
-        """Register all agent classes with the registry."""
-        try:
-            from agents.implementation_agent import ImplementationAgent
-            self.agent_registry.register_agent_class("implementation", ImplementationAgent)
-            
-            from agents.testing_agent import TestingAgent
-            self.agent_registry.register_agent_class("testing", TestingAgent)
-            
-            from agents.architecture_agent import ArchitectureAgent
-            self.agent_registry.register_agent_class("architecture", ArchitectureAgent)
-            
-            from agents.security_agent import SecurityAgent
-            self.agent_registry.register_agent_class("security", SecurityAgent)
-            
-            from agents.performance_agent import PerformanceAgent
-            self.agent_registry.register_agent_class("performance", PerformanceAgent)
-            
-            from agents.documentation_agent import DocumentationAgent
-            self.agent_registry.register_agent_class("documentation", DocumentationAgent)
-            
-            from agents.devops_agent import DevOpsAgent
-            self.agent_registry.register_agent_class("devops", DevOpsAgent)
-            
-        except ImportError as e:
-            self.logger.warning(f"Could not register all agent classes: {e}")
+        """Register all agent classes with the registry by import path."""
+        agent_classes = {
+            "implementation": "agents.implementation_agent:ImplementationAgent",
+            "testing": "agents.testing_agent:TestingAgent",
+            "architecture": "agents.architecture_agent:ArchitectureAgent",
+            "security": "agents.security_agent:SecurityAgent",
+            "performance": "agents.performance_agent:PerformanceAgent",
+            "documentation": "agents.documentation_agent:DocumentationAgent",
+            "devops": "agents.devops_agent:DevOpsAgent",
+        }
+        for agent_type, class_path in agent_classes.items():
+            self.agent_registry.register_agent_class(agent_type, class_path)
+    
+    @staticmethod
+    def _gate_node(name: str, gate):
+        """Wrap a gate so each run is traced as a span and recorded in the gate duration histogram."""
+        traced = span_tracer.wrap(gate, f"gate.{name}", "gate")
+
+        @functools.wraps(gate)
+        async def node(state):
+            started = time.perf_counter()
+            try:
+                return await traced(state)
+            finally:
+                gate_seconds.observe(time.perf_counter() - started, gate=name)
+        return node
     
     def _build_governance_graph(self) -> StateGraph:
         """Build the governance StateGraph focused on quality gates and project oversight."""
@@ -320,15 +354,16 @@ class FlutterSwarmGovernance:
         governance = StateGraph(ProjectGovernanceState)
         
         # Add governance nodes (quality gates and oversight)
-        governance.add_node("project_initiation", self._project_initiation_gate)
-        governance.add_node("architecture_approval", self._architecture_approval_gate)
-        governance.add_node("implementation_oversight", self._implementation_oversight_gate)
-        governance.add_node("quality_verification", self._quality_verification_gate)
-        governance.add_node("security_compliance", self._security_compliance_gate)
-        governance.add_node("performance_validation", self._performance_validation_gate)
-        governance.add_node("documentation_review", self._documentation_review_gate)
-        governance.add_node("deployment_approval", self._deployment_approval_gate)
-        governance.add_node("fallback_coordination", self._fallback_coordination_node)
+        # Each gate runs in a span and is timed, so traces and metrics show where the time goes
+        governance.add_node("project_initiation", self._gate_node("project_initiation", self._project_initiation_gate))
+        governance.add_node("architecture_approval", self._gate_node("architecture_approval", self._architecture_approval_gate))
+        governance.add_node("implementation_oversight", self._gate_node("implementation_oversight", self._implementation_oversight_gate))
+        governance.add_node("quality_verification", self._gate_node("quality_verification", self._quality_verification_gate))
+        governance.add_node("security_compliance", self._gate_node("security_compliance", self._security_compliance_gate))
+        governance.add_node("performance_validation", self._gate_node("performance_validation", self._performance_validation_gate))
+        governance.add_node("documentation_review", self._gate_node("documentation_review", self._documentation_review_gate))
+        governance.add_node("deployment_approval", self._gate_node("deployment_approval", self._deployment_approval_gate))
+        governance.add_node("fallback_coordination", self._gate_node("fallback_coordination", self._fallback_coordination_node))
         
         # Set entry point for governance
         governance.set_entry_point("project_initiation")
@@ -1110,6 +1145,7 @@ class FlutterSwarmGovernance:
         print(f"🔍 Quality Verification Gate: {state['name']}")
         
         gate_name = 'quality_verification'
+        tests_started = None
         
         # Get testing agent from registry
         testing_agent = self.agent_registry.get_agent("testing")
@@ -1137,6 +1173,7 @@ class FlutterSwarmGovernance:
                 
                 # Execute the testing task
                 self.logger.info(f"🚀 Executing testing task for project {project_id}")
+                tests_started = time.time()
                 result = await testing_agent.execute_task(
                     "run_comprehensive_tests", 
                     task_data
@@ -1173,6 +1210,13 @@ class FlutterSwarmGovernance:
                     'documentation_complete': False
                 }
         
+        # Coverage of the changed lines, from the report this gate's test run wrote
+        changed_coverage = await asyncio.to_thread(
+            self._check_diff_coverage, shared_state.get_project_state(state['project_id']), tests_started
+        )
+        if changed_coverage is not None:
+            quality_criteria['changed_lines_covered'] = changed_coverage['percentage'] >= changed_coverage['threshold']
+        
         all_criteria_met = all(quality_criteria.values())
         
         # Update governance state
@@ -1181,6 +1225,7 @@ class FlutterSwarmGovernance:
             'timestamp': datetime.now().isoformat(),
             'criteria_met': quality_criteria,
             'approved': all_criteria_met,
+            'diff_coverage': changed_coverage,
             'notes': 'Quality verification gate evaluation completed'
         })
         
@@ -1941,6 +1986,25 @@ class FlutterSwarmGovernance:
                 return True
         return False
     
+    def _check_diff_coverage(self, project, tests_started: Optional[float]) -> Optional[Dict[str, Any]]:
+        """
+        Check coverage of the lines changed since project.flutter.diff_coverage.base_ref.
+
+        Returns None when the check is disabled, no tests ran, or the project has
+        no coverage report written since tests_started that can be read.
+        """
+        project_path = getattr(project, 'project_path', None) if project else None
+        if not project_path or tests_started is None:
+            return None
+        settings = diff_coverage_settings()
+        if not settings.get('enabled', False):
+            return None
+        result = diff_coverage(project_path, settings.get('base_ref', 'HEAD'), since=tests_started)
+        if result is None:
+            return None
+        result['threshold'] = settings.get('threshold', 80)
+        return result
+    
     def _check_documentation_complete(self, project) -> bool:
         """Check if documentation is complete."""
         if not project:
@@ -2141,7 +2205,8 @@ class FlutterSwarmGovernance:
         # Run the governance workflow
         config = RunnableConfig(recursion_limit=25)  # Prevent infinite loops
         try:
-            result = await self.app.ainvoke(governance_state, config)
+            with span_tracer.span("build", "build", project=name, project_id=project_id):
+                result = await self.app.ainvoke(governance_state, config)
             self.logger.info(f"Build completed for project: {name}")
             
             # Extract project results from shared state
@@ -2180,6 +2245,14 @@ class FlutterSwarmGovernance:
                 "error": str(e),
                 "project_id": project_id
             }
+        finally:
+            try:
+                trace_file = span_tracer.save()
+                if trace_file:
+                    self.logger.info(f"📈 Build trace saved to {trace_file} "
+                                     f"(view with: cli.py trace {span_tracer.session_id})")
+            except Exception as e:
+                self.logger.warning(f"⚠️ Could not save build trace: {e}")
 
 
 # Standalone function for running FlutterSwarm governance